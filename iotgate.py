@@ -30,6 +30,9 @@ import os
 import sys
 import argparse
 import logging
+import signal
+import threading
+from concurrent import futures
 from importlib import util as imp
 
 # Third party modules
@@ -44,6 +47,7 @@ class Script:
     """Script parameters."""
 
     (fullname, basename, name, service) = (None, None, None, False)
+    stop_event = threading.Event()
 
 class Actuator:
     """Objects of respective processors."""
@@ -78,7 +82,7 @@ def setup_cmdline():
     # Position arguments
     parser.add_argument(
         'config',
-        type=argparse.FileType('r'),
+        type=str,
         nargs='?',
         default=config_file,
         help=f'Configuration INI file, default "{config_file}"'
@@ -119,7 +123,7 @@ def setup_cmdline():
 def setup_logger():
     """Configure logging facility."""
     # Set logging to file for module and script logging
-    log_file = '/'.join([Actuator.cmdline.logdir, Script.basename + '.log'])
+    log_file = os.path.join(Actuator.cmdline.logdir, Script.basename + '.log')
     logging.basicConfig(
         level=getattr(logging, Actuator.cmdline.loglevel.upper()),
         format='%(asctime)s - %(levelname)-8s - %(name)s: %(message)s',
@@ -137,33 +141,68 @@ def setup_logger():
     Actuator.logger.info('Script started from file %s', os.path.abspath(__file__))
 
 
+def load_plugin(plugins_path, module_file):
+    """Import a plugin module and instantiate its device class.
+
+    Arguments
+    ---------
+    plugins_path
+        Folder with plugin modules.
+    module_file
+        File name of a plugin module.
+
+    Returns
+    -------
+    plugin
+        Object of a plugin device.
+    plugin_name
+        Name of a plugin module without file extension.
+    plugin_version
+        Version of a plugin module.
+
+    """
+    module_path = os.path.join(plugins_path, module_file)
+    spec = imp.spec_from_file_location(module_file, module_path)
+    plugin_module = imp.module_from_spec(spec)
+    spec.loader.exec_module(plugin_module)
+    plugin = plugin_module.Device()
+    plugin_name = os.path.splitext(plugin_module.__name__)[0]
+    return plugin, plugin_name, plugin_module.__version__
+
+
 def setup_plugins():
-    """Import all plugins."""
+    """Import all plugins concurrently."""
     plugins_path, _, module_files = next(os.walk(Actuator.cmdline.plugindir))
-    # Import plugin modules
+    # Plugin file name should be prefixed with script name
+    prefix = Script.name + '_'
+    module_files = [f for f in module_files if f.startswith(prefix)]
+    # Import plugin modules in parallel for overlapping disk reads
     devices = {}
-    for module_file in module_files:
-        # Plugin file name should be prefixed with script name
-        if not module_file.startswith(Script.name + '_'):
-            continue
-        # Load plugin
-        module_path = os.path.join(plugins_path, module_file)
-        try:
-            spec = imp.spec_from_file_location(module_file, module_path)
-            plugin_module = imp.module_from_spec(spec)
-            spec.loader.exec_module(plugin_module)
-            plugin = plugin_module.Device()
-            plugin_name = os.path.splitext(plugin_module.__name__)[0]
-            plugin_version = plugin_module.__version__
-            plugin_id = plugin.did
-            devices[plugin_id] = plugin
-            log = \
-                f'Loaded plugin="{plugin_name}", version={plugin_version}' \
-                f', did="{plugin_id}"'
-            Actuator.logger.info(log)
-        except Exception as errmsg:
-            log = f'Cannot load plugin "{module_path}": {errmsg}'
-            Actuator.logger.exception(log)
+    workers = min(8, len(module_files)) or 1
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        tasks = {executor.submit(load_plugin, plugins_path, module_file):
+                 module_file for module_file in module_files}
+        for task in futures.as_completed(tasks):
+            module_file = tasks[task]
+            try:
+                plugin, plugin_name, plugin_version = task.result()
+            except (ImportError, AttributeError, SyntaxError) as errmsg:
+                module_path = os.path.join(plugins_path, module_file)
+                log = f'Cannot import plugin "{module_path}": {errmsg}'
+                Actuator.logger.exception(log)
+            # Fallback for errors raised from a plugin class body
+            except Exception as errmsg:
+                module_path = os.path.join(plugins_path, module_file)
+                log = f'Cannot load plugin "{module_path}": {errmsg}'
+                Actuator.logger.exception(log)
+            else:
+                plugin_id = plugin.did
+                devices[plugin_id] = plugin
+                log = \
+                    f'Loaded plugin="{plugin_name}"' \
+                    f', version={plugin_version}' \
+                    f', did="{plugin_id}"'
+                Actuator.logger.info(log)
     # Put list of supported devices to application plugin
     if Script.name in devices:
         Actuator.gate = devices[Script.name]
@@ -176,6 +215,8 @@ def setup_plugins():
 
 def setup():
     """Global initialization."""
+    # Terminate the script peacefully at system service stop
+    signal.signal(signal.SIGTERM, lambda *_: Script.stop_event.set())
     log = \
         f'Script runs as a ' \
         f'{"service" if Script.service else "program"}'
@@ -193,7 +234,7 @@ def loop():
     try:
         Actuator.logger.info('Script loop started')
         log = 'finished'
-        while True:
+        while not Script.stop_event.is_set():
             Actuator.gate.run()
     except (KeyboardInterrupt, SystemExit):
         log = 'cancelled from keyboard'
@@ -30,13 +30,23 @@ __email__ = 'libor.gabaj@gmail.com'
 
 # Standard library modules
 import logging
+import socket
+import sys
+import threading
 from enum import Enum
-from typing import Optional, NoReturn
+from time import monotonic
+from typing import Optional
 
 # Custom library modules
 from gbj_sw import iot as modIot
 import BlynkLib
 
+# Module logger shared by all plugin instances
+_LOGGER = logging.getLogger(' '.join([__name__, __version__]))
+
+# Device identifier derived from the module name just once
+_DID = modIot.get_did(__name__)
+
 
 class Device(modIot.Plugin):
     """Plugin class."""
@@ -63,10 +73,43 @@ class Device(modIot.Plugin):
         HIGH = 1
         LOW = 0
 
+    class Flush(Enum):
+        """Parameters for coalescing virtual writes to the cloud."""
+        WINDOW = 0.05  # Minimal time between flushes in seconds
+        IDLE = 0.005  # Sleep between cloud service cycles in seconds
+        SNDBUF = 262144  # Send buffer of the cloud socket in bytes
+        EPSILON = 0.1  # Minimal change of a numeric value worth sending
+
+    # Mapping from received fan button state to an MQTT command
+    _CMD_BY_STATUS = {
+        CloudConfig.LOW.value: modIot.Command.TURN_OFF.value,
+        CloudConfig.HIGH.value: modIot.Command.TURN_ON.value,
+    }
+
     def __init__(self):
         super().__init__()
-        self._logger = logging.getLogger(' '.join([__name__, __version__]))
+        self._logger = _LOGGER
         self._blynk = None
+        self._cloud_ready = False  # Flag about connection to the cloud
+        self._thread = None  # Thread servicing the cloud communication
+        self._stop = threading.Event()
+        self._pending_writes = {}  # Buffer of latest values per virtual pin
+        self._last_sent = {}  # Recently sent value per virtual pin
+        self._last_flush = monotonic()
+        # Cached enumeration values for hot message processing paths
+        # interned for pointer-fast equality comparisons
+        self._did_server = sys.intern(self.Source.TEMPERATURE_SYSTEM_DID.value)
+        self._did_sfan = sys.intern(self.Source.COOLING_FAN_DID.value)
+        self._measure_value = sys.intern(modIot.Measure.VALUE.value)
+        self._status_active = sys.intern(modIot.Status.ACTIVE.value)
+        self._status_idle = sys.intern(modIot.Status.IDLE.value)
+        self._pin_temperature = self.VirtualPin.TEMPERATURE.value
+        self._pin_fan = self.VirtualPin.FAN.value
+        self._param_temperature = sys.intern(self.Parameter.TEMPERATURE.value)
+        self._param_activity = None  # Resolved from the source fan plugin
+        # Dispatch tables for received messages filled in begin()
+        self._data_table = {}
+        self._status_table = {}
         # Device parameters
         self.set_param(self.get_vpin(self.VirtualPin.TEMPERATURE),
                        self.Parameter.TEMPERATURE,
@@ -78,7 +121,7 @@ class Device(modIot.Plugin):
     @property
     def did(self):
         """Device identifier."""
-        return modIot.get_did(__name__)
+        return _DID
 
     def get_vpin(self, vpin: Enum) -> str:
         """Compose virtual pin string from enumeration item."""
@@ -95,7 +138,7 @@ class Device(modIot.Plugin):
         Flag about successful connection to the cloud.
 
         """
-        if self._blynk:
+        if self._cloud_ready:
             return True
         token = self.config.option(self.CloudConfig.OPTION_API_KEY.value,
                                    self.CloudConfig.SECTION.value)
@@ -111,35 +154,154 @@ class Device(modIot.Plugin):
                 # Propagate button state to the MQTT broker as COMMAND
                 sfan = self.devices[self.Source.COOLING_FAN_DID.value]
                 topic = sfan.get_topic(modIot.Category.COMMAND)
-                status = abs(int(value[0]))
-                if status == self.CloudConfig.LOW.value:
-                    message = modIot.Command.TURN_OFF.value
-                elif status == self.CloudConfig.HIGH.value:
-                    message = modIot.Command.TURN_ON.value
+                message = self._CMD_BY_STATUS.get(abs(int(value[0])))
+                if message is None:
+                    return
                 log = modIot.get_log(message, modIot.Category.COMMAND)
                 self._logger.debug(log)
                 self.mqtt_client.publish(message, topic)
+            self._tune_cloud_socket()
+            self._cloud_ready = True
             return True
 
-    def run(self) -> NoReturn:
-        """Run loop function for communicating with the cloud."""
-        if self._blynk:
-            self._blynk.run()
-            return True
-        return False
+    def _tune_cloud_socket(self) -> None:
+        """Tune the TCP socket of the cloud library for burst traffic.
+
+        - Disabling Nagle's algorithm sends each flushed batch of virtual
+          writes immediatelly instead of waiting for an acknowledgement.
+        - Enlarged send buffer absorbs bursts of writes without blocking
+          the cloud servicing thread in the send system call.
+        - The socket attribute is not a public interface of the cloud
+          library, so the tuning is just the best effort.
+
+        """
+        sock = getattr(self._blynk, 'conn', None) \
+            or getattr(self._blynk, 'sock', None)
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                            self.Flush.SNDBUF.value)
+        except (OSError, AttributeError) as errmsg:
+            self._logger.debug('Cloud socket tuning skipped: %s', errmsg)
+
+    def _enqueue_write(self, pin: int, value) -> None:
+        """Register the latest value for a virtual pin for postponed sending.
+
+        Arguments
+        ---------
+        pin
+            Number of a virtual pin, which the value is dedicated to.
+        value
+            Value for sending to the cloud. A newer value for the same pin
+            overwrites the pending one, so that just the recent value is sent.
+
+        - A value equal to the recently sent one for the same pin is
+          dropped entirely, as resending it would not change anything
+          in a mobile application. Floats count as equal within epsilon.
+
+        """
+        prev = self._last_sent.get(pin)
+        if prev == value:
+            return
+        if isinstance(value, float) and isinstance(prev, float) \
+                and abs(prev - value) < self.Flush.EPSILON.value:
+            return
+        self._pending_writes[pin] = value
+
+    def _flush_writes(self) -> None:
+        """Send all pending virtual pin values to the cloud at once.
+
+        - Values are sent not earlier than after the flush window since
+          the recent flushing, so that bursts of received values are
+          coalesced to one batch of virtual writes.
+        - The buffer is swapped out atomically before iterating, so that
+          values enqueued concurrently from the dispatcher thread cannot
+          mutate the iterated dictionary.
+        - Errors from sending are just logged and values unsent due to
+          them are requeued, so that the cloud servicing thread keeps
+          running and reconnects at next use.
+
+        """
+        if not self._pending_writes:
+            return
+        if monotonic() - self._last_flush < self.Flush.WINDOW.value:
+            return
+        pending, self._pending_writes = self._pending_writes, {}
+        try:
+            if self._cloud_ready or self._setup_cloud():
+                for pin, value in pending.items():
+                    self._blynk.virtual_write(pin, value)
+                    self._last_sent[pin] = value
+                pending.clear()
+        except Exception as errmsg:
+            # Force new connection to the cloud at next use
+            self._cloud_ready = False
+            self._logger.error(errmsg)
+        finally:
+            if pending:
+                # Requeue unsent values without overwriting newer ones
+                pending.update(self._pending_writes)
+                self._pending_writes = pending
+            self._last_flush = monotonic()
+
+    def _run_cloud(self) -> None:
+        """Service cloud communication in a dedicated thread.
+
+        - The thread polls the cloud library and flushes pending virtual
+          writes with a short idle sleep between cycles, so the main script
+          loop does not spin at full CPU on behalf of this plugin.
+
+        """
+        while not self._stop.is_set():
+            if self._blynk:
+                try:
+                    self._blynk.run()
+                except Exception as errmsg:
+                    # Force new connection to the cloud at next use
+                    self._cloud_ready = False
+                    self._logger.error(errmsg)
+                self._flush_writes()
+            self._stop.wait(self.Flush.IDLE.value)
 
 ###############################################################################
 # General actions
 ###############################################################################
     def begin(self):
         super().begin()
+        # Resolve source plugin objects and their parameters just once
+        server = self.devices.get(self._did_server)
+        sfan = self.devices.get(self._did_sfan)
+        if sfan:
+            self._param_activity = sys.intern(sfan.Parameter.ACTIVITY.value)
+        # Build dispatch tables keyed on source plugin identity
+        self._data_table = {
+            (server, self._param_temperature, self._measure_value):
+                self._handle_temperature,
+        }
+        self._status_table = {
+            (sfan, self._param_activity, None):
+                self._handle_fan_status,
+        }
         self._setup_cloud()
+        # Service the cloud in a separate thread keeping the main loop idle
+        self._thread = threading.Thread(target=self._run_cloud,
+                                        name='Blynk',
+                                        daemon=True)
+        self._thread.start()
         self.publish_status()
 
+    def finish(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        super().finish()
+
     def process_own_command(self,
                             value: str,
                             parameter: Optional[str],
-                            measure: Optional[str]) -> NoReturn:
+                            measure: Optional[str]) -> None:
         """Process command for this device only.
 
         Arguments
@@ -164,7 +326,7 @@ class Device(modIot.Plugin):
                      value: str,
                      parameter: Optional[str],
                      measure: Optional[str],
-                     device: modIot.Plugin) -> NoReturn:
+                     device: modIot.Plugin) -> None:
         """Process data from any device except this one.
 
         Arguments
@@ -181,29 +343,27 @@ class Device(modIot.Plugin):
             Object of a sourcing device (plugin), which sent an MQTT message.
 
         """
-        # Process data from plugin 'server'
-        if device.did == self.Source.TEMPERATURE_SYSTEM_DID.value:
-            # Process SoC temperature
-            if parameter == device.Parameter.TEMPERATURE.value \
-                    and measure == modIot.Measure.VALUE.value:
-                try:
-                    temperature = float(value)
-                except (TypeError, ValueError):
-                    log = f'Ignored invalid temperature {value=}'
-                    self._logger.warning(log)
-                else:
-                    # Send temperature to a mobile app
-                    pin = self.VirtualPin.TEMPERATURE.value
-                    if self._setup_cloud():
-                        self._blynk.virtual_write(pin, temperature)
-                    log = f'Received SoC {temperature=}'
-                    self._logger.debug(log)
+        handler = self._data_table.get((device, parameter, measure))
+        if handler:
+            handler(value)
+
+    def _handle_temperature(self, value: str) -> None:
+        """Forward received SoC temperature to a mobile application."""
+        # Payload is always a string decoded from an MQTT message
+        try:
+            temperature = float(value)
+        except ValueError:
+            self._logger.warning('Ignored invalid temperature value=%s', value)
+        else:
+            # Send temperature to a mobile app
+            self._enqueue_write(self._pin_temperature, temperature)
+            self._logger.debug('Received SoC temperature=%s', temperature)
 
     def process_status(self,
                        value: str,
                        parameter: Optional[str],
                        measure: Optional[str],
-                       device: modIot.Plugin) -> NoReturn:
+                       device: modIot.Plugin) -> None:
         """Process status of any device except this one.
 
         Arguments
@@ -220,23 +380,21 @@ class Device(modIot.Plugin):
             Object of a sourcing device (plugin), which sent an MQTT message.
 
         """
-        # Process status from 'fan'
-        if device.did == self.Source.COOLING_FAN_DID.value:
-            if parameter == device.Parameter.ACTIVITY.value \
-                    and measure is None:
-                status = value.strip()
-                log = f'Fan button set to {status=}'
-                pin = self.VirtualPin.FAN.value
-                value = None
-                if status == modIot.Status.ACTIVE.value:
-                    # Turn fan button ON in a mobile app
-                    value = self.CloudConfig.HIGH.value
-                elif status == modIot.Status.IDLE.value:
-                    # Turn fan button OFF in a mobile app
-                    value = self.CloudConfig.LOW.value
-                if value is None:
-                    log = f'Ignored fan {status=}'
-                    self._logger.warning(log)
-                elif self._setup_cloud():
-                    self._blynk.virtual_write(pin, value)
-                    self._logger.debug(log)
+        handler = self._status_table.get((device, parameter, measure))
+        if handler:
+            handler(value)
+
+    def _handle_fan_status(self, value: str) -> None:
+        """Forward received fan activity status to a mobile application."""
+        status = value.strip()
+        if status == self._status_active:
+            # Turn fan button ON in a mobile app
+            value = self.CloudConfig.HIGH.value
+        elif status == self._status_idle:
+            # Turn fan button OFF in a mobile app
+            value = self.CloudConfig.LOW.value
+        else:
+            self._logger.warning('Ignored fan status=%s', status)
+            return
+        self._enqueue_write(self._pin_fan, value)
+        self._logger.debug('Fan button set to status=%s', status)
@@ -27,25 +27,21 @@ __email__ = 'libor.gabaj@gmail.com'
 
 # Standard library modules
 import logging
+import re
+import sys
+import threading
 from enum import Enum
-from typing import Optional, NoReturn
+from typing import Optional
 
 # Custom library modules
 from gbj_sw import iot as modIot
 from gbj_hw.orangepi import OrangePiOne as classPi
 
+# Module logger shared by all plugin instances
+_LOGGER = logging.getLogger(' '.join([__name__, __version__]))
 
-def fan_command(func):
-    """Decorator for handling commands for the fan."""
-    def _decorator(self):
-        command = func(self)
-        # Publish only at real command execution
-        if command:
-            self.set_param(self.activity, self.Parameter.ACTIVITY)
-            self.publish_param(self.Parameter.ACTIVITY)
-            log = f'Executed fan command {command.name}'
-            self.logger.info(log)
-    return _decorator
+# Compiled pattern for a plain decimal number in an MQTT payload
+_NUM_RE = re.compile(r'[+-]?\d+(?:\.\d+)?\Z')
 
 
 class Device(modIot.Plugin):
@@ -78,78 +74,104 @@ class Device(modIot.Plugin):
         MINIMUM = 50.0
         MAXIMUM = 75.0
 
+    class Debounce(Enum):
+        """Parameters for debouncing received temperature percentage."""
+        DEADBAND = 0.5
+
+    class Publish(Enum):
+        """Parameters for quantizing batched parameter publishes."""
+        INTERVAL = 1.0
+
     def __init__(self):
         super().__init__()
-        self._logger = logging.getLogger(' '.join([__name__, __version__]))
+        self._logger = _LOGGER
         self._percentage = None  # Cached received SoC temperature percentage
+        self._processed_percentage = None  # Recently processed percentage
+        self._batching = False  # Flag about coalescing parameter publishes
+        self._pending_pub = set()  # Parameters queued for batched publishing
+        self._flush_timer = None  # One-shot timer for quantized flushing
+        self._pub_interval = self.Publish.INTERVAL.value
+        self._activity_cache = None  # Cached fan activity status
+        self._fan_on = False  # Cached fan state (pin set LOW at init)
+        # Cached enumeration values for hot message processing paths
+        self._did_server = self.Source.TEMPERATURE_SYSTEM_DID.value
+        self._measure_value = modIot.Measure.VALUE.value
+        self._status_active = modIot.Status.ACTIVE.value
+        self._status_idle = modIot.Status.IDLE.value
+        self._measure_percentage = modIot.Measure.PERCENTAGE.value
+        self._param_temperature = None  # Resolved from the source plugin
+        self._src_server = None  # Source plugin object for identity checks
+        self._fan_pin = self.GpioPin.FAN.value
+        self._deadband = self.Debounce.DEADBAND.value
+        self._percon_cache = None  # Cached turn ON threshold percentage
+        self._percoff_cache = None  # Cached turn OFF threshold percentage
+        self._percon_min = self.PercentageOn.MINIMUM.value
+        self._percon_max = self.PercentageOn.MAXIMUM.value
+        self._percoff_min = self.PercentageOff.MINIMUM.value
+        self._percoff_max = self.PercentageOff.MAXIMUM.value
         # Initialize fan
         self._pi = classPi()  # Handler of microcomputer GPIO
-        self._pi.pin_off(self.GpioPin.FAN.value)  # Fan pin to OUTPUT and LOW
+        self._pi.pin_off(self._fan_pin)  # Fan pin to OUTPUT and LOW
         # Device parameters
-        self.set_param(self.GpioPin.FAN.value,
+        self.set_param(self._fan_pin,
                        self.Parameter.FAN,
                        modIot.Measure.GPIO)
         self.set_param(self.activity,
                        self.Parameter.ACTIVITY)
-        self.set_param(self.percon,
-                       self.Parameter.PERCENTAGE_ON,
-                       modIot.Measure.VALUE)
-        self.set_param(self.PercentageOn.DEFAULT.value,
-                       self.Parameter.PERCENTAGE_ON,
-                       modIot.Measure.DEFAULT)
-        self.set_param(self.PercentageOn.MINIMUM.value,
-                       self.Parameter.PERCENTAGE_ON,
-                       modIot.Measure.MINIMUM)
-        self.set_param(self.PercentageOn.MAXIMUM.value,
-                       self.Parameter.PERCENTAGE_ON,
-                       modIot.Measure.MAXIMUM)
-        self.set_param(self.percoff,
-                       self.Parameter.PERCENTAGE_OFF,
-                       modIot.Measure.VALUE)
-        self.set_param(self.PercentageOff.DEFAULT.value,
-                       self.Parameter.PERCENTAGE_OFF,
-                       modIot.Measure.DEFAULT)
-        self.set_param(self.PercentageOff.MINIMUM.value,
-                       self.Parameter.PERCENTAGE_OFF,
-                       modIot.Measure.MINIMUM)
-        self.set_param(self.PercentageOff.MAXIMUM.value,
-                       self.Parameter.PERCENTAGE_OFF,
-                       modIot.Measure.MAXIMUM)
+        # Threshold parameters registered in one data-driven pass
+        # with Enum members bound to locals outside the loop
+        param = self.Parameter
+        measure = modIot.Measure
+        pon = self.PercentageOn
+        poff = self.PercentageOff
+        for value, parameter, meas in (
+                (self.percon, param.PERCENTAGE_ON, measure.VALUE),
+                (pon.DEFAULT.value, param.PERCENTAGE_ON, measure.DEFAULT),
+                (pon.MINIMUM.value, param.PERCENTAGE_ON, measure.MINIMUM),
+                (pon.MAXIMUM.value, param.PERCENTAGE_ON, measure.MAXIMUM),
+                (self.percoff, param.PERCENTAGE_OFF, measure.VALUE),
+                (poff.DEFAULT.value, param.PERCENTAGE_OFF, measure.DEFAULT),
+                (poff.MINIMUM.value, param.PERCENTAGE_OFF, measure.MINIMUM),
+                (poff.MAXIMUM.value, param.PERCENTAGE_OFF, measure.MAXIMUM),
+        ):
+            self.set_param(value, parameter, meas)
 
     @property
     def did(self):
         """Device identifier."""
         return 'sfan'
 
-    @property
-    def logger(self):
-        """Published logger object for loging from external decorators."""
-        return self._logger
-
 ###############################################################################
 # Fan actions
 ###############################################################################
     @property
     def activity(self) -> modIot.Status:
-        """Current fan activity."""
-        pin = self.GpioPin.FAN.value
-        if self._pi.is_pin_input(pin):
-            activity = modIot.Status.IDLE
-        elif self._pi.is_pin_on(pin):
-            activity = modIot.Status.ACTIVE
-        elif self._pi.is_pin_off(pin):
-            activity = modIot.Status.IDLE
-        else:
-            activity = modIot.Status.UNKNOWN
-        return activity.value
+        """Current fan activity updated directly at pin transitions.
+
+        - The pin is driven exclusively by this plugin and set LOW at
+          initialization, so the fan actions keep the cache in sync and
+          the property is a bare attribute read without sysfs access.
+
+        """
+        if self._activity_cache is None:
+            self._activity_cache = self._status_active if self._fan_on \
+                else self._status_idle
+        return self._activity_cache
 
     @property
     def percon(self) -> float:
-        """Current temperature for turning fan ON in percentage."""
-        val = self.get_param(self.Parameter.PERCENTAGE_ON,
-                             modIot.Measure.VALUE,
-                             self.PercentageOn.DEFAULT.value)
-        return val
+        """Current temperature for turning fan ON in percentage.
+
+        - The value is cached on the instance and refreshed by the
+          setter, so the hot control path avoids the parameter lookup.
+
+        """
+        if self._percon_cache is None:
+            self._percon_cache = self.get_param(
+                self.Parameter.PERCENTAGE_ON,
+                modIot.Measure.VALUE,
+                self.PercentageOn.DEFAULT.value)
+        return self._percon_cache
 
     @percon.setter
     def percon(self, percon: float):
@@ -162,26 +184,35 @@ class Device(modIot.Plugin):
         except (ValueError, TypeError):
             pass
         else:
-            # Sanitize new value
-            new = min(max(abs(new), self.PercentageOn.MINIMUM.value),
-                      self.PercentageOn.MAXIMUM.value)
+            # Sanitize new value without min/max call frames
+            new = abs(new)
+            new = self._percon_min if new < self._percon_min \
+                else self._percon_max if new > self._percon_max else new
             # Register new value
+            self._percon_cache = new
             self.set_param(new,
                            self.Parameter.PERCENTAGE_ON,
                            modIot.Measure.VALUE)
             # Publish new value
-            self.publish_param(self.Parameter.PERCENTAGE_ON,
-                               modIot.Measure.VALUE)
+            self._publish_or_queue(self.Parameter.PERCENTAGE_ON,
+                                   modIot.Measure.VALUE)
             # Apply new value
             self.fan_process()
 
     @property
     def percoff(self) -> float:
-        """Current temperature for turning fan OFF in percentage."""
-        val = self.get_param(self.Parameter.PERCENTAGE_OFF,
-                             modIot.Measure.VALUE,
-                             self.PercentageOff.DEFAULT.value)
-        return val
+        """Current temperature for turning fan OFF in percentage.
+
+        - The value is cached on the instance and refreshed by the
+          setter, so the hot control path avoids the parameter lookup.
+
+        """
+        if self._percoff_cache is None:
+            self._percoff_cache = self.get_param(
+                self.Parameter.PERCENTAGE_OFF,
+                modIot.Measure.VALUE,
+                self.PercentageOff.DEFAULT.value)
+        return self._percoff_cache
 
     @percoff.setter
     def percoff(self, percoff: float):
@@ -194,50 +225,115 @@ class Device(modIot.Plugin):
         except (ValueError, TypeError):
             pass
         else:
-            # Sanitize new value
-            new = min(max(abs(new), self.PercentageOff.MINIMUM.value),
-                      self.PercentageOff.MAXIMUM.value)
+            # Sanitize new value without min/max call frames
+            new = abs(new)
+            new = self._percoff_min if new < self._percoff_min \
+                else self._percoff_max if new > self._percoff_max else new
             # Register new period
+            self._percoff_cache = new
             self.set_param(new,
                            self.Parameter.PERCENTAGE_OFF,
                            modIot.Measure.VALUE)
             # Publish new period
-            self.publish_param(self.Parameter.PERCENTAGE_OFF,
-                               modIot.Measure.VALUE)
+            self._publish_or_queue(self.Parameter.PERCENTAGE_OFF,
+                                   modIot.Measure.VALUE)
             # Apply new period
             self.fan_process()
 
-    @fan_command
     def fan_on(self) -> Optional[modIot.Command]:
         """Turn the fan ON if it is OFF."""
-        pin = self.GpioPin.FAN.value
-        if self._pi.is_pin_off(pin):
-            self._pi.pin_on(pin)
+        if not self._fan_on:
+            self._pi.pin_on(self._fan_pin)
+            self._activity_cache = self._status_active
+            self._fan_on = True
+            self._command_executed(modIot.Command.TURN_ON)
             return modIot.Command.TURN_ON
         return None
 
-    @fan_command
     def fan_off(self) -> Optional[modIot.Command]:
         """Turn the fan OFF if it is ON."""
-        pin = self.GpioPin.FAN.value
-        if self._pi.is_pin_on(pin):
-            self._pi.pin_off(pin)
+        if self._fan_on:
+            self._pi.pin_off(self._fan_pin)
+            self._activity_cache = self._status_idle
+            self._fan_on = False
+            self._command_executed(modIot.Command.TURN_OFF)
             return modIot.Command.TURN_OFF
         return None
 
-    @fan_command
     def fan_toggle(self) -> modIot.Command:
         """Toggle the fan."""
-        self._pi.pin_toggle(self.GpioPin.FAN.value)
+        self._pi.pin_toggle(self._fan_pin)
+        self._fan_on = not self._fan_on
+        self._activity_cache = self._status_active if self._fan_on \
+            else self._status_idle
+        self._command_executed(modIot.Command.TOGGLE)
         return modIot.Command.TOGGLE
 
+    def _command_executed(self, command: modIot.Command) -> None:
+        """Register and publish fan activity after an executed command."""
+        self.set_param(self.activity, self.Parameter.ACTIVITY)
+        self._publish_or_queue(self.Parameter.ACTIVITY)
+        self._logger.info('Executed fan command %s', command.name)
+
+    def _publish_or_queue(self,
+                          parameter: Enum,
+                          measure: Optional[Enum] = None) -> None:
+        """Publish a parameter directly or queue it for a batched flush.
+
+        - During processing of an MQTT message several parameters may
+          change at once; they are collected in a set and published in
+          one pass at the end of the processing, so that a message burst
+          does not multiply small MQTT publishes.
+
+        """
+        if self._batching:
+            self._pending_pub.add((parameter, measure))
+        else:
+            self.publish_param(parameter, measure)
+
+    def _flush_pub(self) -> None:
+        """Publish all queued parameters at once."""
+        while self._pending_pub:
+            parameter, measure = self._pending_pub.pop()
+            self.publish_param(parameter, measure)
+
+    def _schedule_flush(self) -> None:
+        """Arm a one-shot timer flushing queued parameter publishes.
+
+        - Publishes are quantized to the publish interval, so several
+          parameter changes within it collapse to one PUBLISH per
+          parameter and measure pair instead of one per event.
+
+        """
+        if not self._pending_pub or self._flush_timer:
+            return
+        self._flush_timer = threading.Timer(self._pub_interval,
+                                            self._flush_timed)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _flush_timed(self) -> None:
+        """Flush queued publishes from the armed timer."""
+        self._flush_timer = None
+        self._flush_pub()
+
     def fan_process(self) -> Optional[modIot.Command]:
-        """Process recent good received temperature percentage from MQTT."""
+        """Process recent good received temperature percentage from MQTT.
+
+        - The cached fan state gates both thresholds, so the steady state
+          (fan already running while hot or already stopped while cool)
+          costs just two comparisons without any GPIO access.
+
+        """
+        percentage = self._percentage
+        fan_on = self._fan_on
+        # Thresholds read directly from the setter-maintained caches,
+        # which are filled during construction
         # Start cooling
-        if self._percentage >= self.percon:
+        if not fan_on and percentage >= self._percon_cache:
             return self.fan_on()
         # Stop cooling
-        if self._percentage <= self.percoff:
+        if fan_on and percentage <= self._percoff_cache:
             return self.fan_off()
         return None
 
@@ -246,12 +342,25 @@ class Device(modIot.Plugin):
 ###############################################################################
     def begin(self):
         super().begin()
+        # Resolve the source system plugin and its data parameter just once
+        server = self.devices.get(self._did_server)
+        if server:
+            self._src_server = server
+            self._param_temperature = server.Parameter.TEMPERATURE.value
         self.publish_status()
 
+    def finish(self):
+        # Publish the rest of queued parameters before stopping
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._flush_pub()
+        super().finish()
+
     def process_own_command(self,
                             value: str,
                             parameter: Optional[str],
-                            measure: Optional[str]) -> NoReturn:
+                            measure: Optional[str]) -> None:
         """Process command for this device only.
 
         Arguments
@@ -266,45 +375,43 @@ class Device(modIot.Plugin):
             from Measure enumeration.
 
         """
-        # Generic commands
-        value = value.strip()
+        # Coalesce parameter publishes caused by this command
+        self._batching = True
+        try:
+            self._process_own_command(value, parameter, measure)
+        finally:
+            self._batching = False
+            self._schedule_flush()
+
+    def _process_own_command(self,
+                             value: str,
+                             parameter: Optional[str],
+                             measure: Optional[str]) -> None:
+        """Execute command actions within a publish batching window."""
+        # Generic commands, interned for pointer-fast dispatch lookups
+        value = sys.intern(value.strip())
         if parameter is None and measure is None:
-            # Publish status
-            if value == modIot.Command.GET_STATUS.value:
-                self.publish_status()
-            # Turn the fan ON
-            if value == modIot.Command.TURN_ON.value:
-                self.fan_on()
-            # Turn the fan OFF
-            if value == modIot.Command.TURN_OFF.value:
-                self.fan_off()
-            # Turn the fan toggle
-            if value == modIot.Command.TOGGLE.value:
-                self.fan_toggle()
-            # Reset status
-            if value == modIot.Command.RESET.value:
-                self.percon = None
-                self.percoff = None
-                log = f'Device reset'
-                self._logger.warning(log)
-        # Change percentage ON
-        if parameter == self.Parameter.PERCENTAGE_ON.value \
-                and measure == modIot.Measure.VALUE.value:
-            self.percon = value
-            log = f'Turn ON temperature set to {self.percon}%'
-            self._logger.warning(log)
-        # Change percentage OFF
-        if parameter == self.Parameter.PERCENTAGE_OFF.value \
-                and measure == modIot.Measure.VALUE.value:
-            self.percoff = value
-            log = f'Turn OFF temperature set to {self.percoff}%'
-            self._logger.warning(log)
+            action = _CMD_DISPATCH.get(value)
+            if action:
+                action(self)
+        else:
+            setter = _PARAM_DISPATCH.get((parameter, measure))
+            if setter:
+                attribute, log = setter
+                setattr(self, attribute, value)
+                self._logger.warning(log, getattr(self, attribute))
+
+    def reset(self) -> None:
+        """Reset threshold percentages to their defaults."""
+        self.percon = None
+        self.percoff = None
+        self._logger.warning('Device reset')
 
     def process_data(self,
                      value: str,
                      parameter: Optional[str],
                      measure: Optional[str],
-                     device: modIot.Plugin) -> NoReturn:
+                     device: modIot.Plugin) -> None:
         """Process data from any device except this one.
 
         Arguments
@@ -322,17 +429,51 @@ class Device(modIot.Plugin):
 
         """
         # Process data from plugin 'system'
-        if device.did == self.Source.TEMPERATURE_SYSTEM_DID.value:
+        if device is self._src_server:
             # Process temperature percentage
-            if parameter == device.Parameter.TEMPERATURE.value \
-                    and measure == modIot.Measure.PERCENTAGE.value:
-                try:
-                    percentage = float(value)
-                except (TypeError, ValueError):
-                    log = f'Ignored invalid temperature percentage {value=}'
-                    self._logger.warning(log)
+            if parameter == self._param_temperature \
+                    and measure == self._measure_percentage:
+                # Payload is always a string decoded from an MQTT message
+                # and validated upfront without raising an exception
+                if not _NUM_RE.match(value.strip()):
+                    self._logger.warning(
+                        'Ignored invalid temperature percentage value=%s',
+                        value)
                 else:
+                    percentage = float(value)
                     self._percentage = percentage
-                    log = f'Process temperature {percentage=}%'
-                    self._logger.debug(log)
-                    self.fan_process()
+                    # Debounce samples within the dead-band of the
+                    # recently processed percentage
+                    processed = self._processed_percentage
+                    if processed is not None \
+                            and abs(percentage - processed) \
+                            < self._deadband:
+                        return
+                    self._processed_percentage = percentage
+                    self._logger.debug('Process temperature percentage=%s%%',
+                                       percentage)
+                    # Coalesce parameter publishes caused by the fan action
+                    self._batching = True
+                    try:
+                        self.fan_process()
+                    finally:
+                        self._batching = False
+                        self._schedule_flush()
+
+
+# Command dispatch table with unbound methods, built once at module import
+_CMD_DISPATCH = {
+    modIot.Command.GET_STATUS.value: Device.publish_status,
+    modIot.Command.TURN_ON.value: Device.fan_on,
+    modIot.Command.TURN_OFF.value: Device.fan_off,
+    modIot.Command.TOGGLE.value: Device.fan_toggle,
+    modIot.Command.RESET.value: Device.reset,
+}
+
+# Dispatch table mapping a topic parameter and measure to a setter property
+_PARAM_DISPATCH = {
+    (Device.Parameter.PERCENTAGE_ON.value, modIot.Measure.VALUE.value):
+        ('percon', 'Turn ON temperature set to %s%%'),
+    (Device.Parameter.PERCENTAGE_OFF.value, modIot.Measure.VALUE.value):
+        ('percoff', 'Turn OFF temperature set to %s%%'),
+}
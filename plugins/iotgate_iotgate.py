@@ -23,9 +23,14 @@ __email__ = 'libor.gabaj@gmail.com'
 
 
 # Standard library modules
+import functools
 import logging
+import queue
+import sys
+import threading
 from enum import Enum
-from typing import Optional, Any, NoReturn
+from random import uniform
+from typing import Optional, Any
 import time
 
 # Custom library modules
@@ -33,6 +38,17 @@ from gbj_sw import iot as modIot
 from gbj_sw import mqtt as modMqtt
 from gbj_sw import timer as modTimer
 
+# Module logger shared by all plugin instances
+_LOGGER = logging.getLogger(' '.join([__name__, __version__]))
+
+# Device identifier derived from the module name just once
+_DID = modIot.get_did(__name__)
+
+# Message category values cached and interned for the hot dispatch path
+_CAT_COMMAND = sys.intern(modIot.Category.COMMAND.value)
+_CAT_STATUS = sys.intern(modIot.Category.STATUS.value)
+_CAT_DATA = sys.intern(modIot.Category.DATA.value)
+
 
 class Device(modIot.Plugin):
     """Plugin class."""
@@ -47,6 +63,11 @@ class Device(modIot.Plugin):
         MINIMUM = 5.0
         MAXIMUM = 180.0
 
+    class Backoff(Enum):
+        """Parameters for jittered exponential backoff of MQTT reconnects."""
+        BASE = 0.5
+        MAXIMUM = 60.0
+
     class MqttConfig(Enum):
         """MQTT configuration parameters for INI file."""
         SECTION = 'MQTTbroker'  # INI section
@@ -57,31 +78,41 @@ class Device(modIot.Plugin):
         DEFAULT_HOST = 'localhost'
         DEFAULT_PORT = 1883
 
-    def __init__(self) -> NoReturn:
+    def __init__(self) -> None:
         super().__init__()
-        self._logger = logging.getLogger(' '.join([__name__, __version__]))
+        self._logger = _LOGGER
         # Device attributes
+        self._reconnect_attempt = 0
+        self._reconnect_next = 0.0  # Monotonic time of next allowed reconnect
+        self._last_connect_status = None  # Recently published connect status
+        self._topic_status = None  # Cached MQTT topic for connect status
+        self._msg_queue = queue.SimpleQueue()  # Received MQTT messages
+        self._dispatcher = None  # Thread consuming the message queue
+        self._category_targets = {}  # Interested plugins per message category
+        self._topic_sep = self.Separator.TOPIC.value  # Cached topic separator
+        # Memoized topic parser; inbound topics repeat heavily, so most
+        # messages resolve to a pre-parsed tuple without string work
+        self._parse_topic = functools.lru_cache(maxsize=1024)(
+            self._parse_topic_uncached)
+        self._device_tuple = ()  # Snapshot of registered plugins
+        self._runner_tuple = ()  # Snapshot of plugins with a run method
         self._timer = modTimer.Timer(self.period,
                                      self._callback_timer_reconnect,
                                      name='MqttRecon')
-        # Device parameters
-        self.set_param(self.period,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.VALUE)
-        self.set_param(self.period,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.DEFAULT)
-        self.set_param(self.Timer.MINIMUM.value,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.MINIMUM)
-        self.set_param(self.Timer.MAXIMUM.value,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.MAXIMUM)
+        # Device parameters registered in one data-driven pass
+        period = self.Parameter.PERIOD
+        for value, measure in (
+                (self.period, modIot.Measure.VALUE),
+                (self.period, modIot.Measure.DEFAULT),
+                (self.Timer.MINIMUM.value, modIot.Measure.MINIMUM),
+                (self.Timer.MAXIMUM.value, modIot.Measure.MAXIMUM),
+        ):
+            self.set_param(value, period, measure)
 
     @property
     def did(self) -> str:
         """Device identifier."""
-        return modIot.get_did(__name__)
+        return _DID
 
     @property
     def period(self) -> float:
@@ -116,15 +147,15 @@ class Device(modIot.Plugin):
 ###############################################################################
 # MQTT actions
 ###############################################################################
-    def _setup_mqtt(self) -> NoReturn:
+    def _setup_mqtt(self) -> None:
         """Define MQTT management."""
         self.mqtt_client = modMqtt.MqttBroker(
             clientid=self.did,
             message=self._callback_on_message,
         )
         # Set last will and testament
-        topic = self.get_topic(modIot.Category.STATUS)
-        self.mqtt_client.lwt(modIot.Status.OFFLINE.value, topic)
+        self._topic_status = self.get_topic(modIot.Category.STATUS)
+        self.mqtt_client.lwt(modIot.Status.OFFLINE.value, self._topic_status)
         # Connect to MQTT broker
         section = self.MqttConfig.SECTION.value
         username = self.config.option(self.MqttConfig.OPTION_USERNAME.value,
@@ -147,7 +178,63 @@ class Device(modIot.Plugin):
     def _callback_on_message(
             self,
             userdata: Any,
-            message: modMqtt.mqttclient.MQTTMessage) -> NoReturn:
+            message: modMqtt.mqttclient.MQTTMessage) -> None:
+        """Queue a received message for processing outside network thread.
+
+        Arguments
+        ---------
+        userdata
+            The private user data.
+        message
+            The object with members `topic`, `payload`, `qos`, `retain`.
+
+        """
+        self._msg_queue.put((userdata, message))
+
+    def _dispatch_loop(self) -> None:
+        """Consume queued MQTT messages in the dispatcher thread.
+
+        - Moving the processing off the paho network thread lets the client
+          return to reading its socket immediately regardless of how long
+          the device plugins take to handle a message.
+
+        """
+        while True:
+            item = self._msg_queue.get()
+            if item is None:
+                break
+            userdata, message = item
+            try:
+                self._dispatch_message(userdata, message)
+            except Exception:
+                self._logger.exception('Message dispatch failed')
+
+    def _parse_topic_uncached(self, topic: str) -> Optional[tuple]:
+        """Split an MQTT topic into its up to four levels.
+
+        Returns
+        -------
+        Tuple of device identifier, category, parameter, and measure
+        padded with None, or None for a topic with too many levels.
+        The device identifier is interned, so the registry lookups and
+        the own-did skip comparison hit on pointer identity.
+
+        """
+        maxvars = 4
+        msg_parts = topic.split(self._topic_sep, maxvars)
+        count = len(msg_parts)
+        if count > maxvars:
+            return None
+        device_id = sys.intern(msg_parts[0])
+        category = sys.intern(msg_parts[1]) if count > 1 else None
+        parameter = msg_parts[2] if count > 2 else None
+        measure = msg_parts[3] if count > 3 else None
+        return device_id, category, parameter, measure
+
+    def _dispatch_message(
+            self,
+            userdata: Any,
+            message: modMqtt.mqttclient.MQTTMessage) -> None:
         """Process actions when a non-filtered message has been received.
 
         Arguments
@@ -158,55 +245,57 @@ class Device(modIot.Plugin):
             The object with members `topic`, `payload`, `qos`, `retain`.
 
         """
+        # Bind hot attributes to locals for the duration of the dispatch
+        devices = self.devices
+        logger = self._logger
         topic = message.topic
         payload = message.payload
         if not payload:
-            log = f'Ignored empty MQTT message'
-            self._logger.warning(log)
+            logger.warning('Ignored empty MQTT message')
             return
         payload = payload.decode('utf-8')
-        # Parse topic
-        maxvars = 4
-        msg_parts = topic.split(self.Separator.TOPIC.value, maxvars)
-        if len(msg_parts) > maxvars:
-            log = f'Ignored too long topic "{topic}"'
-            self._logger.warning(log)
+        # Parse topic through the memoizing cache
+        msg_parts = self._parse_topic(topic)
+        if msg_parts is None:
+            logger.warning('Ignored too long topic "%s"', topic)
             return
-        msg_parts.extend([None] * (maxvars - len(msg_parts)))
         device_id, category, parameter, measure = msg_parts
         # Process device's own command
-        if category == modIot.Category.COMMAND.value:
-            if device_id in self.devices:
-                device = self.devices[device_id]
-                if device.process_own_command:
-                    device.userdata = userdata
-                    device.process_own_command(payload, parameter, measure)
-        # Process foreign status, data, and command (interdevice dependency)
+        if category is _CAT_COMMAND:
+            device = devices.get(device_id)
+            if device is not None and device.process_own_command:
+                device.userdata = userdata
+                device.process_own_command(payload, parameter, measure)
+        # Process foreign status and data (interdevice dependency)
         else:
-            for plugin in self.devices.values():
+            targets = self._category_targets.get(category)
+            if not targets:
+                return
+            device = devices.get(device_id)  # Source device
+            if device is None:
+                return
+            for plugin, handler in targets:
                 if device_id == plugin.did:
                     continue
-                device = self.devices[device_id]  # Source device
                 plugin.userdata = userdata
-                try:
-                    if category == modIot.Category.STATUS.value:
-                        plugin.process_status(payload, parameter, measure,
-                                              device)
-                    elif category == modIot.Category.DATA.value:
-                        plugin.process_data(payload, parameter, measure,
-                                            device)
-                    elif category == modIot.Category.COMMAND.value:
-                        plugin.process_command(payload, parameter, measure,
-                                               device)
-                except AttributeError:
-                    continue
+                handler(payload, parameter, measure, device)
 
     def publish_connect(self, status: modIot.Status):
-        """Publish connection status to MQTT broker."""
+        """Publish connection status to MQTT broker.
+
+        - Back-to-back publishing of an unchanged status is suppressed,
+          so that repeated connection callbacks on flaky links do not spam
+          the broker with redundant status messages.
+
+        """
+        if status == self._last_connect_status:
+            return
+        self._last_connect_status = status
         message = status.value
-        topic = self.get_topic(modIot.Category.STATUS)
-        log = modIot.get_log(message, modIot.Category.STATUS)
-        self._logger.debug(log)
+        topic = self._topic_status or self.get_topic(modIot.Category.STATUS)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            log = modIot.get_log(message, modIot.Category.STATUS)
+            self._logger.debug(log)
         self.mqtt_client.publish(message, topic)
 
 ###############################################################################
@@ -215,17 +304,48 @@ class Device(modIot.Plugin):
     def begin(self):
         """Start all registered plugins including this one and timers."""
         super().begin()
+        # Consume received messages in a dedicated dispatcher thread
+        self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                            name='MqttDispatch',
+                                            daemon=True)
+        self._dispatcher.start()
         self._setup_mqtt()
         self.publish_connect(modIot.Status.ONLINE)
         self.publish_status()
-        # Start all plugins except this one and subscribe to their MQTT topics
+        # Start all plugins except this one
         for device in self.devices.values():
             if device != self:
                 device.devices = self.devices
                 device.config = self.config
                 device.mqtt_client = self.mqtt_client
                 device.begin()
-            self.mqtt_client.subscribe(device.device_topic)
+        # Index plugins interested in foreign messages by category, so
+        # fan-out touches only plugins implementing the processing hook;
+        # built before subscribing, so that the routing table is complete
+        # when retained messages arrive right after the subscription
+        self._category_targets = {
+            _CAT_STATUS: tuple(
+                (plugin, plugin.process_status)
+                for plugin in self.devices.values()
+                if hasattr(plugin, 'process_status')),
+            _CAT_DATA: tuple(
+                (plugin, plugin.process_data)
+                for plugin in self.devices.values()
+                if hasattr(plugin, 'process_data')),
+        }
+        # Snapshot registered plugins into dense tuples for loop paths
+        self._device_tuple = tuple(self.devices.values())
+        self._runner_tuple = tuple(
+            device for device in self._device_tuple
+            if device is not self and hasattr(device, 'run'))
+        # Subscribe to all device topics, in one SUBSCRIBE packet where
+        # the broker client accepts a topic list
+        topics = [device.device_topic for device in self._device_tuple]
+        try:
+            self.mqtt_client.subscribe([(topic, 0) for topic in topics])
+        except (TypeError, ValueError):
+            for topic in topics:
+                self.mqtt_client.subscribe(topic)
         if self._timer:
             self._timer.start()
 
@@ -233,13 +353,9 @@ class Device(modIot.Plugin):
         """Run loop function of all registered plugins including this one."""
         # Run all plugins except this one
         run_cnt = 0
-        for device in self.devices.values():
-            if device != self:
-                try:
-                    if device.run():
-                        run_cnt += 1
-                except AttributeError:
-                    continue
+        for device in self._runner_tuple:
+            if device.run():
+                run_cnt += 1
         # No plugin has run method, use default functionality
         if run_cnt == 0:
             time.sleep(0.1)
@@ -249,23 +365,47 @@ class Device(modIot.Plugin):
         if self._timer:
             self._timer.stop()
         # Stop all plugins
-        for device in self.devices.values():
+        for device in self._device_tuple or self.devices.values():
             if device == self:
                 continue
             device.finish()
         self.publish_connect(modIot.Status.OFFLINE)
         self.mqtt_client.disconnect()
+        # Stop the dispatcher thread after the last queued message
+        if self._dispatcher:
+            self._msg_queue.put(None)
+            self._dispatcher.join()
         super().finish()
 
     def _callback_timer_reconnect(self):
-        """Execute MQTT reconnect."""
-        if not self.mqtt_client.connected:
+        """Execute MQTT reconnect with jittered exponential backoff.
+
+        - Repeated reconnect failures postpone the next attempt by a random
+          delay within an exponentially growing window, so that many gateway
+          instances do not hammer a recovering broker at the same instants.
+
+        """
+        if self.mqtt_client.connected:
+            self._reconnect_attempt = 0
+            return
+        if time.monotonic() < self._reconnect_next:
+            return
+        try:
             self.mqtt_client.reconnect()
+        except Exception:
+            self._reconnect_attempt += 1
+            delay = uniform(0.0, min(self.Backoff.MAXIMUM.value,
+                                     self.Backoff.BASE.value
+                                     * 2 ** self._reconnect_attempt))
+            self._reconnect_next = time.monotonic() + delay
+            self._logger.warning('MQTT reconnect postponed for %.1fs', delay)
+        else:
+            self._reconnect_attempt = 0
 
     def process_own_command(self,
                             value: str,
                             parameter: Optional[str],
-                            measure: Optional[str]) -> NoReturn:
+                            measure: Optional[str]) -> None:
         """Process command for this device only.
 
         Arguments
@@ -280,19 +420,33 @@ class Device(modIot.Plugin):
             from Measure enumeration.
 
         """
-        # Generic commands
+        # Generic commands, interned for pointer-fast dispatch lookups
+        value = sys.intern(value.strip())
         if parameter is None and measure is None:
-            # Publish status
-            if value == modIot.Command.GET_STATUS.value:
-                self.publish_status()
-            # Reset status
-            if value == modIot.Command.RESET.value:
-                self.period = None
-                log = f'Device reset'
-                self._logger.warning(log)
-        # Change timer period
-        if parameter == self.Parameter.PERIOD.value \
-                and measure == modIot.Measure.VALUE.value:
-            self.period = value
-            log = f'Timer period set to {self.period}s'
-            self._logger.warning(log)
+            action = _CMD_DISPATCH.get(value)
+            if action:
+                action(self)
+        else:
+            setter = _PARAM_DISPATCH.get((parameter, measure))
+            if setter:
+                attribute, log = setter
+                setattr(self, attribute, value)
+                self._logger.warning(log, getattr(self, attribute))
+
+    def reset(self) -> None:
+        """Reset timer period to its default."""
+        self.period = None
+        self._logger.warning('Device reset')
+
+
+# Command dispatch table with unbound methods, built once at module import
+_CMD_DISPATCH = {
+    modIot.Command.GET_STATUS.value: Device.publish_status,
+    modIot.Command.RESET.value: Device.reset,
+}
+
+# Dispatch table mapping a topic parameter and measure to a setter property
+_PARAM_DISPATCH = {
+    (Device.Parameter.PERIOD.value, modIot.Measure.VALUE.value):
+        ('period', 'Timer period set to %ss'),
+}
@@ -23,13 +23,16 @@ __email__ = 'libor.gabaj@gmail.com'
 import logging
 from random import randint
 from enum import Enum
-from typing import Optional, NoReturn
+from typing import Optional
 
 # Custom library modules
 from gbj_sw import iot as modIot
 from gbj_sw import timer as modTimer
 from gbj_sw import statfilter as modFilter
 
+# Module logger shared by all plugin instances
+_LOGGER = logging.getLogger(' '.join([__name__, __version__]))
+
 
 def read_temperature(system_path: str) -> float:
     """Read system file and interpret the content as the temperature.
@@ -82,11 +85,13 @@ class Device(modIot.Plugin):
         MINIMUM = 00.0   # Interval for random temperatures
         MAXIMUM = 75.0
 
-    def __init__(self) -> NoReturn:
+    def __init__(self) -> None:
         super().__init__()
-        self._logger = logging.getLogger(' '.join([__name__, __version__]))
+        self._logger = _LOGGER
         # Device attributes
         self._temperature_max = None
+        self._topic_temperature = None  # Cached MQTT topic for temperature
+        self._topic_percentage = None  # Cached MQTT topic for percentage
         self._timer = modTimer.Timer(self.period,
                                      self._callback_timer_temperature,
                                      name='SoCtemp')
@@ -153,30 +158,36 @@ class Device(modIot.Plugin):
     def publish_temperature(self):
         """Read and publish current temperature."""
         message = f'{self.temperature:.1f}'
-        topic = self.get_topic(
-            modIot.Category.DATA,
-            self.Parameter.TEMPERATURE,
-            modIot.Measure.VALUE)
-        log = modIot.get_log(message,
-                             modIot.Category.DATA,
-                             self.Parameter.TEMPERATURE,
-                             modIot.Measure.VALUE)
-        self._logger.debug(log)
+        if self._topic_temperature is None:
+            self._topic_temperature = self.get_topic(
+                modIot.Category.DATA,
+                self.Parameter.TEMPERATURE,
+                modIot.Measure.VALUE)
+        topic = self._topic_temperature
+        if self._logger.isEnabledFor(logging.DEBUG):
+            log = modIot.get_log(message,
+                                 modIot.Category.DATA,
+                                 self.Parameter.TEMPERATURE,
+                                 modIot.Measure.VALUE)
+            self._logger.debug(log)
         self.mqtt_client.publish(message, topic)
 
     def publish_percentage(self):
         """Calculate and publish percentage of recent current temperature."""
         percentage = self.temp2perc(self._filter.result())
         message = f'{percentage:.1f}'
-        topic = self.get_topic(
-            modIot.Category.DATA,
-            self.Parameter.TEMPERATURE,
-            modIot.Measure.PERCENTAGE)
-        log = modIot.get_log(message,
-                             modIot.Category.DATA,
-                             self.Parameter.TEMPERATURE,
-                             modIot.Measure.PERCENTAGE)
-        self._logger.debug(log)
+        if self._topic_percentage is None:
+            self._topic_percentage = self.get_topic(
+                modIot.Category.DATA,
+                self.Parameter.TEMPERATURE,
+                modIot.Measure.PERCENTAGE)
+        topic = self._topic_percentage
+        if self._logger.isEnabledFor(logging.DEBUG):
+            log = modIot.get_log(message,
+                                 modIot.Category.DATA,
+                                 self.Parameter.TEMPERATURE,
+                                 modIot.Measure.PERCENTAGE)
+            self._logger.debug(log)
         self.mqtt_client.publish(message, topic)
 
 ###############################################################################
@@ -274,7 +285,7 @@ class Device(modIot.Plugin):
     def process_own_command(self,
                             value: str,
                             parameter: Optional[str],
-                            measure: Optional[str]) -> NoReturn:
+                            measure: Optional[str]) -> None:
         """Process command for this device only.
 
         Arguments
@@ -27,7 +27,7 @@ __email__ = 'libor.gabaj@gmail.com'
 import logging
 import socket
 from enum import Enum
-from typing import Optional, NoReturn
+from typing import Optional
 from time import time
 
 # Custom library modules
@@ -35,6 +35,12 @@ import paho.mqtt.publish as mqttpublish
 from gbj_sw import iot as modIot
 from gbj_sw import timer as modTimer
 
+# Module logger shared by all plugin instances
+_LOGGER = logging.getLogger(' '.join([__name__, __version__]))
+
+# Device identifier derived from the module name just once
+_DID = modIot.get_did(__name__)
+
 
 class Device(modIot.Plugin):
     """Plugin class."""
@@ -76,31 +82,36 @@ class Device(modIot.Plugin):
 
     def __init__(self):
         super().__init__()
-        self._logger = logging.getLogger(' '.join([__name__, __version__]))
+        self._logger = _LOGGER
         self._cloudprm = {}
         self._buffer = {}  # Buffer for cloud fields
+        self._topic_cloud_data = None  # Cached MQTT topic for cloud data
         self._timestamp = None  # Time of recent publishing to cloud
+        # Cached enumeration values for hot message processing paths
+        self._did_server = self.Source.TEMPERATURE_SYSTEM_DID.value
+        self._did_sfan = self.Source.COOLING_FAN_DID.value
+        self._measure_value = modIot.Measure.VALUE.value
+        self._param_activity = None  # Resolved from the source fan plugin
+        # Dispatch tables for received messages filled in begin()
+        self._data_table = {}
+        self._status_table = {}
         self._timer = modTimer.Timer(self.period,
                                      self._callback_timer_publish,
                                      name='ThingSpeak')
-        # Device parameters
-        self.set_param(self.period,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.VALUE)
-        self.set_param(self.Timer.DEFAULT.value,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.DEFAULT)
-        self.set_param(self.Timer.MINIMUM.value,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.MINIMUM)
-        self.set_param(self.Timer.MAXIMUM.value,
-                       self.Parameter.PERIOD,
-                       modIot.Measure.MAXIMUM)
+        # Device parameters registered in one data-driven pass
+        period = self.Parameter.PERIOD
+        for value, measure in (
+                (self.period, modIot.Measure.VALUE),
+                (self.Timer.DEFAULT.value, modIot.Measure.DEFAULT),
+                (self.Timer.MINIMUM.value, modIot.Measure.MINIMUM),
+                (self.Timer.MAXIMUM.value, modIot.Measure.MAXIMUM),
+        ):
+            self.set_param(value, period, measure)
 
     @property
     def did(self):
         """Device identifier."""
-        return modIot.get_did(__name__)
+        return _DID
 
     @property
     def period(self) -> float:
@@ -135,7 +146,7 @@ class Device(modIot.Plugin):
 ###############################################################################
 # Cloud actions
 ###############################################################################
-    def _setup_cloud(self) -> NoReturn:
+    def _setup_cloud(self) -> None:
         """Define cloud management parameters."""
         section = self.CloudConfig.SECTION.value
         self._cloudprm[self.CloudConfig.CLIENT_ID.name] = \
@@ -171,14 +182,14 @@ class Device(modIot.Plugin):
         return self._buffer[self.CloudBuffer.FAN_STATUS.value]
 
     @status_fan.setter
-    def status_fan(self, status: modIot.Status) -> NoReturn:
+    def status_fan(self, status: modIot.Status) -> None:
         """Remap and update fan status."""
         status_new = \
             f'{self.CloudConfig.FAN_STATUS_PREFIX.value}' \
             f'{status.value}'
         self._buffer[self.CloudBuffer.FAN_STATUS.value] = status_new
 
-    def publish_buffer(self) -> NoReturn:
+    def publish_buffer(self) -> None:
         """Publish values in buffer."""
         # Check plugin started
         if self.CloudConfig.OPTION_CHANNEL_ID.name not in self._cloudprm:
@@ -244,15 +255,18 @@ class Device(modIot.Plugin):
             else:
                 # Publish payload to a MQTT broker as DATA
                 message = payload
-                topic = self.get_topic(
-                    modIot.Category.DATA,
-                    self.Parameter.CLOUD_DATA,
-                    modIot.Measure.VALUE)
-                log = modIot.get_log(message,
-                                     modIot.Category.DATA,
-                                     self.Parameter.CLOUD_DATA,
-                                     modIot.Measure.VALUE)
-                self._logger.debug(log)
+                if self._topic_cloud_data is None:
+                    self._topic_cloud_data = self.get_topic(
+                        modIot.Category.DATA,
+                        self.Parameter.CLOUD_DATA,
+                        modIot.Measure.VALUE)
+                topic = self._topic_cloud_data
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    log = modIot.get_log(message,
+                                         modIot.Category.DATA,
+                                         self.Parameter.CLOUD_DATA,
+                                         modIot.Measure.VALUE)
+                    self._logger.debug(log)
                 self.mqtt_client.publish(message, topic)
         else:
             self._logger.debug('Nothing published to cloud')
@@ -262,6 +276,22 @@ class Device(modIot.Plugin):
 ###############################################################################
     def begin(self):
         super().begin()
+        # Resolve status parameter of the source fan plugin just once
+        sfan = self.devices.get(self._did_sfan)
+        if sfan:
+            self._param_activity = sfan.Parameter.ACTIVITY.value
+        # Build dispatch tables keyed on source plugin identity
+        server = self.devices.get(self._did_server)
+        param_temperature = server.Parameter.TEMPERATURE.value if server \
+            else None
+        self._data_table = {
+            (server, param_temperature, self._measure_value):
+                self._handle_temperature,
+        }
+        self._status_table = {
+            (sfan, self._param_activity, None):
+                self._handle_fan_status,
+        }
         self._setup_cloud()
         self.publish_status()
         if self._timer:
@@ -279,7 +309,7 @@ class Device(modIot.Plugin):
     def process_own_command(self,
                             value: str,
                             parameter: Optional[str],
-                            measure: Optional[str]) -> NoReturn:
+                            measure: Optional[str]) -> None:
         """Process command for this device only.
 
         Arguments
@@ -309,7 +339,7 @@ class Device(modIot.Plugin):
                      value: str,
                      parameter: Optional[str],
                      measure: Optional[str],
-                     device: modIot.Plugin) -> NoReturn:
+                     device: modIot.Plugin) -> None:
         """Process data from any device except this one.
 
         Arguments
@@ -326,27 +356,26 @@ class Device(modIot.Plugin):
             Object of a sourcing device (plugin), which sent an MQTT message.
 
         """
-        # Process data from plugin 'server'
-        if device.did == self.Source.TEMPERATURE_SYSTEM_DID.value:
-            # Process SoC temperature
-            if parameter == device.Parameter.TEMPERATURE.value \
-                    and measure == modIot.Measure.VALUE.value:
-                try:
-                    temperature = float(value)
-                except (TypeError, ValueError):
-                    log = f'Ignored invalid temperature {value=}'
-                    self._logger.warning(log)
-                else:
-                    self._buffer[self.CloudBuffer.TEMPERATURE_SERVER.value] \
-                        = temperature
-                    log = f'Received SoC {temperature=}'
-                    self._logger.debug(log)
+        handler = self._data_table.get((device, parameter, measure))
+        if handler:
+            handler(value)
+
+    def _handle_temperature(self, value: str) -> None:
+        """Buffer received SoC temperature for the cloud."""
+        try:
+            temperature = float(value)
+        except ValueError:
+            self._logger.warning('Ignored invalid temperature value=%s', value)
+        else:
+            self._buffer[self.CloudBuffer.TEMPERATURE_SERVER.value] \
+                = temperature
+            self._logger.debug('Received SoC temperature=%s', temperature)
 
     def process_status(self,
                        value: str,
                        parameter: Optional[str],
                        measure: Optional[str],
-                       device: modIot.Plugin) -> NoReturn:
+                       device: modIot.Plugin) -> None:
         """Process status of any device except this one.
 
         Arguments
@@ -363,20 +392,20 @@ class Device(modIot.Plugin):
             Object of a sourcing device (plugin), which sent an MQTT message.
 
         """
-        # Process status from 'fan'
-        if device.did == self.Source.COOLING_FAN_DID.value:
-            if parameter == device.Parameter.ACTIVITY.value \
-                    and measure is None:
-                status = value.strip()
-                if status in [
-                        modIot.Status.ACTIVE.value,
-                        modIot.Status.IDLE.value,
-                        modIot.Status.UNKNOWN.value,
-                ]:
-                    self.status_fan = modIot.Status(status)
-                    log = f'Received {status=}'
-                    self._logger.debug(log)
-                    self.publish_buffer()
-                else:
-                    log = f'Ignored uknown {status=}'
-                    self._logger.warning(log)
+        handler = self._status_table.get((device, parameter, measure))
+        if handler:
+            handler(value)
+
+    def _handle_fan_status(self, value: str) -> None:
+        """Buffer received fan activity status and publish to the cloud."""
+        status = value.strip()
+        if status in [
+                modIot.Status.ACTIVE.value,
+                modIot.Status.IDLE.value,
+                modIot.Status.UNKNOWN.value,
+        ]:
+            self.status_fan = modIot.Status(status)
+            self._logger.debug('Received status=%s', status)
+            self.publish_buffer()
+        else:
+            self._logger.warning('Ignored uknown status=%s', status)